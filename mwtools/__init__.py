@@ -64,6 +64,38 @@ wiki.get_pages("Art_collectors_by_nationality",
 #  'List']
 ```
 
+Large trees can be traversed within limits (`max_depth`, `max_pages`,
+`max_requests` or a `deadline`). The pages found so far are returned with a
+continuation, which can be saved (e.g. as JSON) and passed back to carry on.
+`merge_pages` combines the pages of successive calls.
+
+```python
+from mwtools import merge_pages
+
+pages, continuation = wiki.get_pages("Art_collectors_by_nationality",
+                                     recursive=True,
+                                     max_requests=100)
+while continuation:
+    more, continuation = wiki.get_pages("Art_collectors_by_nationality",
+                                        recursive=True,
+                                        max_requests=100,
+                                        continuation=continuation)
+    merge_pages(pages, more)
+```
+
+When web scraping large category trees, parsing can be spread over several
+processes. Subcategory pages are then downloaded and parsed in the background.
+The worker processes import the main module, so scripts must guard their entry
+point with `if __name__ == '__main__':`.
+
+```python
+if __name__ == '__main__':
+    with MediaWikiTools('en.wikipedia.org', processes=4) as wiki:
+        wiki.get_pages("Art_collectors_by_nationality",
+                       recursive=True,
+                       use_api=False)
+```
+
 Get pages from subcategories as a dictionary containing subcategories as keys.
 `'self'` contains the pages in the root category. Using `recursive` in
 combination with the `with_subcats` results in a nested dictionary.
@@ -84,6 +116,20 @@ wiki.get_pages("Art_collectors_by_nationality",
 #  'Yugoslav art collectors': ['Antun Bauer (museologist)', 'Erich Šlomović']}
 ```
 
+Large recursive trees can be returned as a compact `CategoryTree` instead. It
+can be used like the nested dictionary, with each page stored only once.
+
+```python
+tree = wiki.get_pages("Art_collectors_by_nationality",
+                      recursive=True,
+                      with_subcats=True,
+                      as_tree=True)
+tree['Art_collectors_by_nationality']['American art collectors']['self']
+# ['William Hayes Ackland', ...]
+tree.flatten()      # unique pages of the whole tree
+tree.to_dict()      # nested dictionary
+```
+
 ## Getting sets
 
 Get an intersection of 2 or more categories.
@@ -146,7 +192,37 @@ wiki.get_set(['Countries in Asia',
 # same as above
 ```
 
+## Worker processes
+
+Setting up a `MediaWikiTools` object connects to the wiki to find its page name
+and API. Pass a snapshot (or the pickled object) to worker processes instead;
+connections are made again on first use.
+
+```python
+snapshot = hp_wiki.snapshot()
+
+# in the worker
+wiki = MediaWikiTools.from_snapshot(snapshot)
+```
+
+## Querying many wikis
+
+`WikiPool` sets up several wikis at once, sharing connections and caches, and
+runs queries on all of them in parallel. Results are yielded as each wiki
+finishes.
+
+```python
+from mwtools import WikiPool
+
+pool = WikiPool(['en.wikipedia.org', 'de.wikipedia.org'], max_per_host=4)
+
+for url, pages in pool.get_pages('1980 births'):
+    print(url, len(pages))
+```
+
 """
 
-from .mediawikitools import MediaWikiTools
-__all__ = ["MediaWikiTools"]
+from .mediawikitools import MediaWikiTools, merge_pages
+from .wikipool import WikiPool
+from .cattree import CategoryTree
+__all__ = ["MediaWikiTools", "WikiPool", "CategoryTree", "merge_pages"]
@@ -0,0 +1,120 @@
+"""CategoryTree class module."""
+import sys
+from array import array
+from collections.abc import Mapping
+from typing import Iterator, Optional, Union
+
+
+class _TitleTable:
+	"""Table of unique page titles shared by the nodes of a tree."""
+
+	__slots__ = ('titles', 'index')
+
+	def __init__(self):
+		self.titles: list[str] = []
+		self.index: dict[str, int] = {}
+
+	def encode(self, titles: list[str]) -> array:
+		"""Get the array of indices of `titles`, adding new titles to the table."""
+		indices = array('I')
+		for title in titles:
+			if (i := self.index.get(title)) is None:
+				i = self.index[title] = len(self.titles)
+				self.titles.append(sys.intern(title))
+			indices.append(i)
+		return indices
+
+	def decode(self, indices: array) -> list[str]:
+		"""Get the titles of an array of indices."""
+		return [self.titles[i] for i in indices]
+
+
+class CategoryTree(Mapping):
+	"""Compact, read only, tree of categories returned by `get_pages`.
+
+	Behaves like the nested dictionary returned with `with_subcats`: `'self'`
+	gives the pages of the category and each subcategory name gives its subtree
+	(or list of pages). Pages are stored once in a table shared by the whole
+	tree and lists are only built when accessed.
+
+	Args:
+		table (_TitleTable, optional): Title table to share with other nodes.
+			Defaults to a new table.
+	"""
+
+	__slots__ = ('_table', '_pages', '_children')
+
+	def __init__(self, table: Optional[_TitleTable] = None):
+		"""Create CategoryTree instance."""
+		self._table = _TitleTable() if table is None else table
+		self._pages: Optional[array] = None
+		self._children: dict[str, Union[array, 'CategoryTree']] = {}
+
+	def __setitem__(self, key: str, value: Union[list[str], 'CategoryTree']):
+		"""Set the pages (`'self'`) or a subcategory while building the tree."""
+		if key == 'self':
+			self._pages = self._table.encode(value)
+		elif isinstance(value, CategoryTree):
+			self._children[sys.intern(key)] = value
+		else:
+			self._children[sys.intern(key)] = self._table.encode(value)
+
+	def __getitem__(self, key: str) -> Union[list[str], 'CategoryTree']:
+		"""Get the pages (`'self'`) or the subtree of a subcategory."""
+		if key == 'self' and self._pages is not None:
+			return self._table.decode(self._pages)
+
+		value = self._children[key]
+		return value if isinstance(value, CategoryTree) else self._table.decode(
+		    value)
+
+	def __iter__(self) -> Iterator[str]:
+		"""Iterate over `'self'` (if set) and the subcategory names."""
+		if self._pages is not None:
+			yield 'self'
+		yield from self._children
+
+	def __len__(self) -> int:
+		"""Get the number of keys, including `'self'`."""
+		return len(self._children) + (self._pages is not None)
+
+	def __repr__(self) -> str:
+		"""Represent CategoryTree instance by its keys."""
+		return f'CategoryTree({list(self)})'
+
+	def _indices(self) -> Iterator[array]:
+		"""Iterate over the page index arrays of the tree."""
+		if self._pages is not None:
+			yield self._pages
+		for value in self._children.values():
+			if isinstance(value, CategoryTree):
+				yield from value._indices()
+			else:
+				yield value
+
+	def flatten(self, unique: bool = True) -> list[str]:
+		"""Get the pages of the whole tree.
+
+		Args:
+			unique (bool, optional): Remove duplicate pages. Defaults to True.
+
+		Returns:
+			list[str]: Pages of the tree.
+		"""
+		if not unique:
+			return [
+			    title for indices in self._indices()
+			    for title in self._table.decode(indices)
+			]
+
+		seen = set()
+		for indices in self._indices():
+			seen.update(indices)
+		return self._table.decode(sorted(seen))
+
+	def to_dict(self) -> dict:
+		"""Convert to the nested dictionary of lists returned by `get_pages`."""
+		return {
+		    key: value.to_dict() if isinstance(value, CategoryTree) else value
+		    for key, value in self.items()
+		}
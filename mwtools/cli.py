@@ -0,0 +1,178 @@
+"""Command line interface for running batches of queries.
+
+Queries are read from a JSONL file (one query per line) or a YAML file (a
+list of queries, requires `pyyaml`). Each query names a wiki and exactly one
+`MediaWikiTools` method with its keyword arguments, for example:
+
+```yaml
+- id: births
+  wiki: harrypotter.fandom.com
+  get_pages: {input_link: 1980_births}
+- wiki: en.wikipedia.org
+  get_set:
+    categories: [Countries in Asia, Countries_in_Europe]
+    operations: '&'
+```
+
+or as JSONL, with each query on a single line:
+
+```json
+{"wiki": "en.wikipedia.org", "get_pages": {"input_link": "1980_births"}}
+```
+
+All wikis are set up once in a shared `WikiPool` and the queries run
+concurrently. Results are written as JSON lines as soon as each query finishes
+and a timing summary is printed to stderr at the end.
+
+```
+mwtools queries.jsonl -o results.jsonl
+```
+"""
+import argparse
+import json
+import sys
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from time import perf_counter
+from typing import Any, Optional, Union
+from .cattree import CategoryTree
+from .wikipool import WikiPool
+
+METHODS = ('get_pages', 'get_set')
+
+
+def _to_json(obj: Any) -> Any:
+	"""Convert results that json can not serialise (e.g. `CategoryTree`)."""
+	if isinstance(obj, CategoryTree):
+		return obj.to_dict()
+	raise TypeError(
+	    f'Object of type {type(obj).__name__} is not JSON serializable')
+
+
+def read_queries(path: str, default_wiki: Optional[str] = None) -> list[dict]:
+	"""Read and validate a batch file of queries.
+
+	Args:
+		path (str): Path of a `.jsonl`, `.yaml` or `.yml` file, `-` for JSONL
+			from stdin.
+		default_wiki (str, optional): Wiki of queries without a `wiki` key.
+			Defaults to None.
+
+	Raises:
+		ValueError: If a query is invalid.
+
+	Returns:
+		list[dict]: Queries with `id`, `wiki`, `method` and `kwargs` keys.
+	"""
+	if path.endswith(('.yaml', '.yml')):
+		try:
+			import yaml
+		except ImportError:
+			raise ImportError('pyyaml is required to read YAML batch files')
+		with open(path) as f:
+			raw = yaml.safe_load(f) or []
+	else:
+		f = sys.stdin if path == '-' else open(path)
+		with f:
+			raw = [json.loads(line) for line in f if line.strip()]
+
+	queries = []
+	for i, query in enumerate(raw):
+		methods = [m for m in METHODS if m in query]
+		if len(methods) != 1:
+			raise ValueError(f'Query {i} needs exactly one of {METHODS}: {query}')
+		if not (wiki := query.get('wiki', default_wiki)):
+			raise ValueError(f'Query {i} has no wiki: {query}')
+
+		queries.append({
+		    'id': query.get('id', i),
+		    'wiki': wiki,
+		    'method': methods[0],
+		    'kwargs': query[methods[0]],
+		})
+
+	return queries
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+	"""Run the `mwtools` command.
+
+	Args:
+		argv (list[str], optional): Command line arguments. Defaults to
+			`sys.argv[1:]`.
+
+	Returns:
+		int: Exit code, 1 if any query failed.
+	"""
+	parser = argparse.ArgumentParser(
+	    prog='mwtools', description='Run a batch of MediaWikiTools queries.')
+	parser.add_argument('batch',
+	                    help='JSONL or YAML file of queries, - for stdin')
+	parser.add_argument('-o',
+	                    '--output',
+	                    help='JSONL file to write results to, defaults to stdout')
+	parser.add_argument('-w', '--wiki', help='wiki of queries without "wiki"')
+	parser.add_argument('--workers',
+	                    type=int,
+	                    default=16,
+	                    help='maximum number of concurrent queries')
+	parser.add_argument('--max-per-host',
+	                    type=int,
+	                    default=4,
+	                    help='maximum concurrent requests to a single host')
+	args = parser.parse_args(argv)
+
+	start = perf_counter()
+	queries = read_queries(args.batch, args.wiki)
+
+	pool = WikiPool(list(dict.fromkeys(q['wiki'] for q in queries)),
+	                max_workers=args.workers,
+	                max_per_host=args.max_per_host)
+	setup_time = perf_counter() - start
+
+	def run(query: dict) -> tuple[Union[list, dict], float]:
+		query_start = perf_counter()
+		if query['wiki'] in pool.errors:
+			raise pool.errors[query['wiki']]
+		wiki = pool.wikis[query['wiki']]
+		result = getattr(wiki, query['method'])(**query['kwargs'])
+		return result, perf_counter() - query_start
+
+	out = open(args.output, 'w') if args.output else sys.stdout
+	times, failed = [], 0
+	with ThreadPoolExecutor(max_workers=args.workers) as executor:
+		futures = {executor.submit(run, query): query for query in queries}
+		for future in as_completed(futures):
+			query = futures[future]
+			record = {'id': query['id'], 'wiki': query['wiki']}
+			try:
+				result, seconds = future.result()
+				record.update(result=result, seconds=round(seconds, 3))
+				# inside try, so one unserialisable result is only an error record
+				line = json.dumps(record, ensure_ascii=False, default=_to_json)
+				times.append(seconds)
+			except Exception as e:
+				record.pop('result', None)
+				record.pop('seconds', None)
+				record['error'] = f'{type(e).__name__}: {e}'
+				line = json.dumps(record, ensure_ascii=False)
+				failed += 1
+			out.write(line + '\n')
+			out.flush()
+
+	if out is not sys.stdout:
+		out.close()
+
+	total = perf_counter() - start
+	print(f'{len(queries)} queries on {len(pool.wikis)} wikis, {failed} failed\n'
+	      f'setup: {setup_time:.2f}s, total: {total:.2f}s',
+	      file=sys.stderr)
+	if times:
+		print(f'per query: mean {sum(times) / len(times):.2f}s, '
+		      f'max {max(times):.2f}s',
+		      file=sys.stderr)
+
+	return 1 if failed else 0
+
+
+if __name__ == '__main__':
+	sys.exit(main())
@@ -1,16 +1,110 @@
 """MediaWikiTools class module."""
 # %%
+import os
 import requests
 from bs4 import BeautifulSoup
 from bs4.element import PageElement
-from urllib.parse import urlparse, quote
+from urllib.parse import urlparse, urljoin, quote
 import re
-from typing import Union
+from typing import Iterator, NamedTuple, Optional, Union
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from itertools import chain
+from collections import deque
+from collections.abc import Mapping
+from html import unescape
+from multiprocessing import get_all_start_methods, get_context
+from threading import Lock, local
+from time import time
 from warnings import warn
 from mediawiki import MediaWiki
+from .cattree import CategoryTree, _TitleTable
 # from pprint import pprint
 # import mwparserfromhell as mwp
 
+USER_AGENT = ('MediaWiki-Tools/0.1.0 '
+              '(https://github.com/nick-robo/MediaWiki-Tools)')
+
+# "next page" link of the pages section of a category listing
+NEXT_PAGE_RE = re.compile(r'<a [^>]*?href="([^"]*?'
+                          r'[?&](?:amp;)?pagefrom=[^"]*)"'
+                          r'[^>]*>next page</a>')
+
+# default continuation of get_pages, passing None starts a resumable traversal
+_NO_CONTINUATION = object()
+
+
+def _is_full_page(text: str) -> bool:
+	"""Check whether html is a complete skinned document (not render output)."""
+	return '<html' in text[:1000].lower()
+
+
+def _is_no_such_action(text: str) -> bool:
+	"""Check whether html is the error page of an unknown or disabled action."""
+	return 'nosuchaction' in text or 'No such action' in text
+
+
+def merge_pages(pages: Union[list[str], dict],
+                more: Union[list[str], dict]) -> Union[list[str], dict]:
+	"""Merge pages returned by successive `get_pages` calls with a continuation.
+
+	Args:
+		pages (Union[list[str], dict]): Pages to merge into (modified in place).
+		more (Union[list[str], dict]): Pages of the next call.
+
+	Returns:
+		Union[list[str], dict]: The merged pages.
+	"""
+	if isinstance(pages, list):
+		pages.extend(more)
+		return pages
+
+	for key, value in more.items():
+		pages[key] = merge_pages(pages[key], value) if key in pages else value
+	return pages
+
+
+class _Listing(NamedTuple):
+	"""Compact result of parsing a category listing page."""
+
+	is_category: bool
+	pages: list[str]
+	subcats: list[tuple[str, str]]
+
+
+def _parse_listing(text: str, page_name: str) -> _Listing:
+	"""Parse a category listing page into page titles and subcategory links.
+
+	Module level so it can run in a process pool, only titles are returned.
+
+	Args:
+		text (str): Html of the listing page.
+		page_name (str): Page name of the wiki (wiki.com/page_name/Page).
+
+	Returns:
+		_Listing: Whether the page is a category, unfiltered page titles and
+			(name, href) of subcategories.
+	"""
+	data = BeautifulSoup(text, 'html.parser')
+
+	# if category is title (render output has no heading)
+	heading = data.find(id='firstHeading')
+	is_category = 'Category:' in heading.text if heading else bool(
+	    data.find(class_='mw-category-generated'))
+
+	pages = [
+	    link.text for link in content.find_all('a')
+	    # page links only, skip wikipedia learn more
+	    if (h := link.get('href')) and page_name in h
+	    and link.text != 'learn more'
+	] if (content := data.find(id='mw-pages')) else []
+
+	subcats = [(link.text, h)
+	           for link in s.find_all('a')
+	           if (h := link.get('href')) and 'Category' in h
+	           ] if (s := data.find(id='mw-subcategories')) else []
+
+	return _Listing(is_category, pages, subcats)
+
 
 class MediaWikiTools:
 	"""MediaWikiTools object of a MediaWiki page.
@@ -18,9 +112,25 @@ class MediaWikiTools:
 	Args:
 		input_url (str): A url from the wiki to be subsetted. Preferrably, the main
 			page or API of the wiki.
+		session (requests.Session, optional): Session to make requests with, can
+			be shared between instances. Defaults to a new session.
+		cache (dict, optional): Cache of category members, can be shared between
+			instances. Entries are never invalidated, clear the dict to get fresh
+			results. Defaults to None (no caching).
+		processes (int, optional): Number of processes used to parse category
+			pages when web scraping, 0 parses in the calling thread. Defaults to 0.
+
+	Note:
+		Parsing processes are started with `forkserver` (or `spawn`) and import
+			the main module, which must guard its entry point with
+			`if __name__ == '__main__':` when `processes` is used.
 	"""
 
-	def __init__(self, input_url: str):
+	def __init__(self,
+	             input_url: str,
+	             session: Optional[requests.Session] = None,
+	             cache: Optional[dict] = None,
+	             processes: int = 0):
 		"""Create MediaWikiTools instance."""
 		# TODO: fails on input wikipedia.org (without en.)
 		# TODO: check if input is a MediaWiki...
@@ -47,7 +157,19 @@ class MediaWikiTools:
 			match = re.search('%(.*?)%', path)
 		self.page_name = match.group(1) if match else None
 
-		page = requests.get(self.base_url)
+		# share one connection pool (keep-alive, gzip) across all requests
+		self._set_connections(session)
+
+		# category members by (api url, category), see _category_members
+		self.cache = cache
+
+		# pools for parsing scraped pages, created on first use
+		self.processes = processes
+
+		# 'render' fetches article body only, falls back to 'full' if unsupported
+		self.fetch_mode = 'render'
+
+		page = self.session.get(self.base_url)
 		if not page.ok:
 			raise Exception(f"Couldn't connect to {self.base_url}")
 
@@ -100,20 +222,137 @@ class MediaWikiTools:
 			if not target:
 				continue
 
-			# TODO: Find faster way than creating object
+			# probe with the session, the pymediawiki client is created on first use
 			try:
-				self.mw = MediaWiki(target)
+				res = self.session.get(target,
+				                       params={
+				                           'action': 'query',
+				                           'meta': 'siteinfo',
+				                           'siprop': 'namespaces',
+				                           'format': 'json',
+				                           'formatversion': 2,
+				                       }).json()
+				namespace = res['query']['namespaces']['14']
+				# old wikis ignore formatversion
+				self.category_prefix = namespace.get('name', namespace.get('*'))
 				self.api_url = target
 				self.has_api = True
 				break
 			except Exception:
 				continue
 		else:
-			self.mw = None
 			self.has_api = False
 			self.api_url = None
+			self.category_prefix = 'Category'
 			warn('Could not find API, web scraping will be used')
 
+	def _set_connections(self, session: Optional[requests.Session] = None):
+		"""Set the session and reset clients and pools (created lazily).
+
+		Args:
+			session (requests.Session, optional): Session to use. Defaults to a
+				new session.
+		"""
+		if session is None:
+			session = requests.Session()
+			session.headers.update({'User-Agent': USER_AGENT})
+		self._session = session
+		self._mw: Optional[MediaWiki] = None
+		self._parse_pool: Optional[ProcessPoolExecutor] = None
+		self._prefetch_pool: Optional[ThreadPoolExecutor] = None
+		self._pool_lock = Lock()
+		# requests made by the current thread, see _get
+		self._requests = local()
+		# connections are not shared with forked processes
+		self._pid = os.getpid()
+
+	def _get(self, url: str, **kwargs) -> requests.Response:
+		"""Make a GET request with the session, counting it for `_traverse`."""
+		self._requests.count = getattr(self._requests, 'count', 0) + 1
+		return self.session.get(url, **kwargs)
+
+	@property
+	def session(self) -> requests.Session:
+		"""requests.Session: Session used for requests, new after a fork."""
+		if self._pid != os.getpid():
+			self._set_connections()
+		return self._session
+
+	@property
+	def mw(self) -> Optional[MediaWiki]:
+		"""MediaWiki: pymediawiki client of the api, created on first use."""
+		if self._pid != os.getpid():
+			self._set_connections()
+		if self._mw is None and self.has_api:
+			self._mw = MediaWiki(self.api_url)
+		return self._mw
+
+	def snapshot(self) -> dict:
+		"""Get the discovered configuration and cache of the wiki.
+
+		The snapshot can be pickled and restored with `from_snapshot` without
+		connecting to the wiki again.
+
+		Returns:
+			dict: Configuration and category member cache of this wiki.
+		"""
+		return {
+		    'parsed_url': self.parsed_url.geturl(),
+		    'base_url': self.base_url,
+		    'page_name': self.page_name,
+		    'page_base_url': self.page_base_url,
+		    'api_url': self.api_url,
+		    'has_api': self.has_api,
+		    'category_prefix': self.category_prefix,
+		    'fetch_mode': self.fetch_mode,
+		    'processes': self.processes,
+		    # leave out entries of other wikis in a shared cache
+		    'cache': {
+		        key: value
+		        for key, value in self.cache.items() if key[0] == self.api_url
+		    } if self.cache is not None else None,
+		}
+
+	@classmethod
+	def from_snapshot(cls,
+	                  snapshot: dict,
+	                  session: Optional[requests.Session] = None,
+	                  cache: Optional[dict] = None) -> 'MediaWikiTools':
+		"""Create MediaWikiTools instance from a snapshot (see `snapshot`).
+
+		Args:
+			snapshot (dict): Snapshot of a MediaWikiTools instance.
+			session (requests.Session, optional): Session to make requests with.
+				Defaults to a new session.
+			cache (dict, optional): Cache to add the snapshot cache to. Defaults to
+				the snapshot cache (None if the instance had no cache).
+
+		Returns:
+			MediaWikiTools: Instance for the same wiki, connections are made on
+				first use.
+		"""
+		wiki = cls.__new__(cls)
+		wiki.__setstate__(snapshot)
+		if session is not None:
+			wiki._set_connections(session)
+		if cache is not None:
+			cache.update(wiki.cache or {})
+			wiki.cache = cache
+		return wiki
+
+	def __getstate__(self) -> dict:
+		"""Pickle the snapshot only, sessions and pools are not picklable."""
+		return self.snapshot()
+
+	def __setstate__(self, state: dict):
+		"""Restore from a snapshot."""
+		state = dict(state)
+		self.parsed_url = urlparse(state.pop('parsed_url'))
+		cache = state.pop('cache')
+		self.cache = dict(cache) if cache is not None else None
+		self.__dict__.update(state)
+		self._set_connections()
+
 	def _filter_page(self, page: Union[str, PageElement], get_lists: bool,
 	                 list_only: bool) -> bool:
 		# TODO: Add flexible filter list with regex
@@ -152,15 +391,211 @@ class MediaWikiTools:
 		else:
 			return True
 
+	def _split_title(self, input_page: str) -> tuple[Optional[str], str]:
+		"""Split a page name into its namespace and url encoded title."""
+		# attempt to get namespace
+		namespace = re.search(r'([A-Z]\w+)(:)', input_page)
+		namespace = namespace.group(1) if namespace else None
+
+		# use ':' for RE search
+		if namespace:
+			match = re.search(r'([:])(.+)', input_page)
+			return namespace, quote(match.group(2).replace(' ', '_'))
+
+		# get fragment if incomplete url and url encode it
+		match = re.search(r'([A-Z].+)', input_page)
+		if not match:
+			raise ValueError(f'Invalid input: {input_page}')
+		return None, quote(match.group(1).replace(' ', '_'))
+
+	def _fetch(self, url: str, full_page: bool = False) -> requests.Response:
+		"""Fetch a page using the leanest html output the wiki supports.
+
+		Args:
+			url (str): Url of the page.
+			full_page (bool, optional): Always fetch the full skinned page.
+				Defaults to False.
+
+		Returns:
+			requests.Response: The response of the request.
+		"""
+		if full_page or self.fetch_mode != 'render':
+			return self._get(url)
+
+		page = self._get(url, params={'action': 'render'})
+
+		# action=render is ignored (full page) or disabled (no such action error),
+		# other errors (e.g. 404 of a missing page) are returned as they are
+		if page.ok and _is_full_page(page.text):
+			self.fetch_mode = 'full'
+		elif not page.ok and _is_no_such_action(page.text):
+			self.fetch_mode = 'full'
+			page = self._get(url)
+
+		return page
+
+	def _get_page(self,
+	              input_page: str,
+	              full_page: bool = False) -> requests.Response:
+		"""Get the response for a category name or url (see `get_data`)."""
+		if 'http' in input_page:
+			page = self._fetch(input_page, full_page)
+		else:
+			namespace, input_page = self._split_title(input_page)
+
+			if namespace:
+				page = self._fetch(
+				    self.page_base_url + namespace + ':' + input_page, full_page)
+			else:
+				page = self._fetch(self.page_base_url + 'Category:' + input_page,
+				                   full_page)
+
+			# if not category
+			if not page.ok:
+				page = self._fetch(self.page_base_url + input_page, full_page)
+
+		if not page.ok:
+			raise Exception(f'Failed on page {page}')
+
+		return page
+
+	def _parse(self,
+	           text: str,
+	           parse_pool: Optional[ProcessPoolExecutor] = None) -> _Listing:
+		"""Parse a listing page, in the process pool if enabled.
+
+		Args:
+			text (str): Html of the listing page.
+			parse_pool (ProcessPoolExecutor, optional): Pool to parse in. Defaults
+				to the parsing pool of the instance.
+
+		Returns:
+			_Listing: Parsed listing.
+		"""
+		if not self.processes:
+			return _parse_listing(text, self.page_name)
+
+		parse_pool = parse_pool or self._get_pools()[0]
+		return parse_pool.submit(_parse_listing, text, self.page_name).result()
+
+	def _get_pools(self) -> tuple[ProcessPoolExecutor, ThreadPoolExecutor]:
+		"""Get the parsing and prefetching pools, creating them on first use."""
+		if self._pid != os.getpid():
+			self._set_connections()
+
+		# _parse is called from several prefetch threads
+		with self._pool_lock:
+			if not self._parse_pool:
+				# do not fork the (multi-threaded) process
+				self._parse_pool = ProcessPoolExecutor(
+				    max_workers=self.processes,
+				    mp_context=get_context(
+				        'forkserver' if 'forkserver' in
+				        get_all_start_methods() else 'spawn'))
+				self._prefetch_pool = ThreadPoolExecutor(max_workers=2 *
+				                                         self.processes)
+		return self._parse_pool, self._prefetch_pool
+
+	def _load_listing(
+	    self,
+	    input_link: str,
+	    parse: bool = False,
+	    parse_pool: Optional[ProcessPoolExecutor] = None
+	) -> tuple[Optional[str], Union[str, _Listing]]:
+		"""Download a listing page and find the url of its next page.
+
+		Args:
+			input_link (str): Url or name of the category.
+			parse (bool, optional): Parse the page too. Defaults to False.
+			parse_pool (ProcessPoolExecutor, optional): Pool to parse in (see
+				`_parse`). Defaults to None.
+
+		Returns:
+			tuple[Optional[str], Union[str, _Listing]]: Url of the next page (if
+				any) and the html or parsed listing.
+		"""
+		text = self._get_page(input_link).text
+
+		# find next page link in raw html to start download before parsing
+		match = NEXT_PAGE_RE.search(text)
+		next_url = urljoin(self.base_url, unescape(
+		    match.group(1))) if match else None
+
+		return next_url, self._parse(text, parse_pool) if parse else text
+
+	def _prefetch(self, input_link: str) -> Future:
+		"""Download and parse a listing page in the background."""
+		# pass the pool, so prefetch threads never wait on _pool_lock (see close)
+		parse_pool, prefetch_pool = self._get_pools()
+		return prefetch_pool.submit(self._load_listing, input_link, True,
+		                            parse_pool)
+
+	def _iter_listing(self,
+	                  input_link: str,
+	                  paginate: bool = True,
+	                  first: Optional[Future] = None) -> Iterator[_Listing]:
+		"""Iterate over the pages of a category listing.
+
+		The next listing page is downloaded in the background while the current
+		one is being parsed.
+
+		Args:
+			input_link (str): Url or name of the category.
+			paginate (bool, optional): Follow "next page" links. Defaults to True.
+			first (Future, optional): Prefetched first page (see `_prefetch`).
+				Defaults to None.
+
+		Yields:
+			_Listing: Parsed listing of each page.
+		"""
+		with ThreadPoolExecutor(max_workers=1) as executor:
+			future = first or executor.submit(self._load_listing, input_link)
+			while future:
+				next_url, listing = future.result()
+				future = executor.submit(
+				    self._load_listing,
+				    next_url) if paginate and next_url else None
+
+				yield self._parse(listing) if isinstance(listing, str) else listing
+
+	def close(self):
+		"""Shut down the parsing pools (see `processes`).
+
+		Prefetches that have not started yet are cancelled.
+		"""
+		with self._pool_lock:
+			pools = self._prefetch_pool, self._parse_pool
+			self._parse_pool = self._prefetch_pool = None
+
+		# wait outside the lock. prefetch threads wait on the parse pool, shut
+		# them down first
+		for pool in pools:
+			if pool:
+				pool.shutdown(cancel_futures=True)
+
+	def __enter__(self) -> 'MediaWikiTools':
+		"""Use as a context manager closing the parsing pools on exit."""
+		return self
+
+	def __exit__(self, *exc_info):
+		"""Close the parsing pools (see `close`)."""
+		self.close()
+
 	def get_data(self,
 	             input_page: str,
-	             print_pretty: bool = False) -> BeautifulSoup:
+	             print_pretty: bool = False,
+	             full_page: bool = False) -> BeautifulSoup:
 		"""Get BeautifulSoup page data from category name or url.
 
+		Only the page content (`action=render`) is downloaded when the wiki
+		supports it, so the skin (`#firstHeading`, sidebars, etc.) is missing.
+
 		Args:
 				input (str): Category name or url.
 				print_pretty (bool, optional): Pretty print data for debuging. Defaults to
 					False.
+				full_page (bool, optional): Get the full skinned page. Defaults to
+					False.
 
 		Raises:
 				Exception: If request fails.
@@ -168,44 +603,293 @@ class MediaWikiTools:
 		Returns:
 				BeautifulSoup: BeautifulSoup object of input page.
 		"""
+		page = self._get_page(input_page, full_page)
+
+		data = BeautifulSoup(page.text, 'html.parser')
+
+		if print_pretty:
+			print(data.prettify())
+
+		return data
+
+	def get_wikitext(self, input_page: str) -> str:
+		"""Get the raw wikitext of a page (`action=raw`).
+
+		Args:
+			input_page (str): Page name or url.
+
+		Raises:
+			Exception: If request fails.
+
+		Returns:
+			str: Wikitext of the page.
+		"""
 		if 'http' in input_page:
-			page = requests.get(input_page)
+			url = input_page
 		else:
-			# attempt to get namespace
-			namespace = re.search(r'([A-Z]\w+)(:)', input_page)
-			namespace = namespace.group(1) if namespace else None
+			namespace, title = self._split_title(input_page)
+			url = self.page_base_url + (namespace + ':' if namespace else '') + title
 
-			# use ':' for RE search
-			if namespace:
-				match = re.search(r'([:])(.+)', input_page)
-				input_page = quote(match.group(2).replace(' ', '_'))
+		page = self._get(url, params={'action': 'raw'})
+
+		if not page.ok:
+			raise Exception(f'Failed on page {page}')
+
+		return page.text
+
+	def _category_name(self, input_link: str) -> str:
+		"""Get the category name (without prefix) of a url or name for the api."""
+		cat_name = input_link
+
+		if any(x in input_link for x in self.base_url.split('/') if x):
+			i = input_link.split('/').index(self.page_name)
+			cat_name = '/'.join(input_link.split('/')[i + 1:]) or input_link
+
+		# the english prefix works on every wiki
+		for prefix in (self.category_prefix, 'Category'):
+			if cat_name.startswith(prefix + ':'):
+				return cat_name[len(prefix) + 1:]
+
+		return cat_name
+
+	def _category_batch(
+	    self,
+	    cat_name: str,
+	    cont: Optional[dict] = None,
+	    limit: Union[int, str] = 'max'
+	) -> tuple[list[str], list[str], Optional[dict]]:
+		"""Get one batch (one request) of category members using the api.
+
+		Requests only titles and types with `formatversion=2`.
+
+		Args:
+			cat_name (str): Category name without prefix.
+			cont (dict, optional): Api continue parameters of the batch. Defaults
+				to None (first batch).
+			limit (Union[int, str], optional): Maximum number of members. Defaults
+				to 'max', the largest batch size the wiki allows.
+
+		Raises:
+			Exception: If the api returns an error.
+
+		Returns:
+			tuple[list[str], list[str], Optional[dict]]: Pages, subcategories
+				(without prefix) and continue parameters of the next batch (None if
+				this was the last batch).
+		"""
+		prefix = self.category_prefix
+		params = {
+		    'action': 'query',
+		    'format': 'json',
+		    'formatversion': 2,
+		    'list': 'categorymembers',
+		    'cmtitle': f'{prefix}:{cat_name}',
+		    'cmprop': 'title|type',
+		    'cmtype': 'page|subcat|file',
+		    'cmlimit': limit,
+		    **(cont or {}),
+		}
+		pages, subcats = [], []
+
+		res = self._get(self.api_url, params=params).json()
+		if 'error' in res:
+			raise Exception(f"API error on {cat_name}: {res['error']}")
+
+		for member in res['query']['categorymembers']:
+			if member['type'] == 'subcat':
+				title = member['title']
+				subcats.append(title[len(prefix) + 1:] if title.
+				               startswith(prefix + ':') else title)
 			else:
-				# get fragment if incomplete url and url encode it
-				match = re.search(r'([A-Z].+)', input_page)
-				if not match:
-					raise ValueError(f'Invalid input: {input_page}')
-				input_page = quote(match.group(1).replace(' ', '_'))
+				pages.append(member['title'])
 
-			if namespace:
-				page = requests.get(self.page_base_url + namespace + ':' +
-				                    input_page)
+		# old wikis use query-continue
+		if 'continue' in res:
+			cont = res['continue']
+		elif 'categorymembers' in res.get('query-continue', {}):
+			cont = res['query-continue']['categorymembers']
+		else:
+			cont = None
+
+		return pages, subcats, cont
+
+	def _category_members(self,
+	                      cat_name: str,
+	                      store: bool = True) -> tuple[list[str], list[str]]:
+		"""Get all pages and subcategories of a category using the api.
+
+		Args:
+			cat_name (str): Category name without prefix.
+			store (bool, optional): Add the members to the cache (if any). Defaults
+				to True.
+
+		Returns:
+			tuple[list[str], list[str]]: Pages and subcategories (without prefix).
+		"""
+		key = (self.api_url, cat_name.replace('_', ' '))
+		if self.cache is not None and key in self.cache:
+			return self.cache[key]
+
+		pages, subcats = [], []
+		cont = None
+
+		while True:
+			pages_res, subcats_res, cont = self._category_batch(cat_name, cont)
+			pages.extend(pages_res)
+			subcats.extend(subcats_res)
+			if not cont:
+				break
+
+		if self.cache is not None and store:
+			self.cache[key] = pages, subcats
+		return pages, subcats
+
+	def _traverse(self,
+	              input_link: str,
+	              max_depth: Optional[int],
+	              recursive: bool,
+	              with_subcats: bool,
+	              get_lists: bool,
+	              list_only: bool,
+	              use_api: bool,
+	              max_pages: Optional[int],
+	              max_requests: Optional[int],
+	              deadline: Optional[float],
+	              continuation: Optional[dict] = None
+	              ) -> tuple[Union[list[str], dict], Optional[dict]]:
+		"""Get pages of a category tree one listing at a time within limits.
+
+		Categories are visited breadth first from a frontier of categories and
+		their continue position (api continue parameters or url of the next
+		listing page, and the number of its pages already returned). The
+		frontier is returned as the continuation when a limit is reached. See
+		`get_pages` for the arguments.
+
+		Returns:
+			tuple[Union[list[str], dict], Optional[dict]]: Pages found by this call
+				(see `merge_pages`) and the continuation (None once finished). A
+				category with several parents is only listed under the first one
+				found, unlike without limits.
+		"""
+		api = bool(self.has_api and use_api)
+		if not api and any(x in self.base_url for x in ['wikia.', 'fandom.com']):
+			raise NotImplementedError(
+			    'Web scraping not implemented for wikia/fandom.com')
+
+		if continuation is None:
+			if api:
+				category = self._category_name(input_link)
+				root = category
 			else:
-				page = requests.get(self.page_base_url + 'Category:' +
-				                    input_page)
+				category = input_link
+				root = input_link.split(':')[-1].replace('_', ' ')
+			continuation = {
+			    'api': api,
+			    'frontier': [{
+			        'category': category,
+			        'path': [root],
+			        'cont': None,
+			        'offset': 0
+			    }],
+			    'seen': [category],
+			}
+		elif continuation['api'] != api:
+			raise ValueError('Continuation was made with use_api='
+			                 f"{continuation['api']}")
+
+		# copy, so the continuation passed in can be used again
+		frontier = deque(dict(item) for item in continuation['frontier'])
+		seen = set(continuation['seen'])
+
+		# nested by category path, converted to the shape of get_pages at the end
+		tree: dict = {}
+		pages: list[str] = []
+		n_pages = 0
+		self._requests.count = 0
+
+		while frontier:
+			# the requests of one listing (incl. fallbacks, user page checks) can go
+			# over max_requests
+			if ((max_pages is not None and n_pages >= max_pages)
+			    or (max_requests is not None
+			        and self._requests.count >= max_requests)
+			    or (deadline is not None and time() >= deadline)):
+				break
 
-			# if not category
-			if not page.ok:
-				page = requests.get(self.page_base_url + input_page)
+			item = frontier[0]
+			if api:
+				# do not request more pages than allowed (subcats count too)
+				limit = 'max' if max_pages is None or max_pages - n_pages >= 500 \
+				    else max_pages - n_pages
+				pages_res, subcats, cont = self._category_batch(
+				    item['category'], item['cont'], limit)
+				subcats = [(cat, cat) for cat in subcats]
+			else:
+				cont, listing = self._load_listing(item['cont'] or item['category'],
+				                                   parse=True)
+				if not listing.is_category:
+					raise NotImplementedError('This is broken')
+				# lists are assumed to be on the first page
+				cont = None if list_only else cont
+				pages_res = listing.pages
+				# subcategories are only listed on the first page
+				subcats = [] if item['cont'] else [
+				    (name, urljoin(self.base_url, h)) for name, h in listing.subcats
+				]
 
-		if not page.ok:
-			raise Exception(f'Failed on page {page}')
+			# skip pages of this listing returned by a previous call
+			pages_res = [
+			    page for page in pages_res
+			    if self._filter_page(page, get_lists, list_only)
+			][item['offset']:]
 
-		data = BeautifulSoup(page.text, 'html.parser')
+			# stop within the listing, continue from the same listing and offset
+			trimmed = max_pages is not None and n_pages + len(
+			    pages_res) > max_pages
+			if trimmed:
+				pages_res = pages_res[:max_pages - n_pages]
+			n_pages += len(pages_res)
 
-		if print_pretty:
-			print(data.prettify())
+			if with_subcats:
+				node = tree
+				for name in item['path']:
+					node = node.setdefault(name, {})
+				node.setdefault('self', []).extend(pages_res)
+			else:
+				pages.extend(pages_res)
 
-		return data
+			# add unseen subcategories within max depth to the frontier
+			if max_depth is None or len(item['path']) <= max_depth:
+				for name, category in subcats:
+					if category not in seen:
+						seen.add(category)
+						frontier.append({
+						    'category': category,
+						    'path': item['path'] + [name],
+						    'cont': None,
+						    'offset': 0
+						})
+
+			if trimmed:
+				item['offset'] += len(pages_res)
+			elif cont:
+				item['cont'], item['offset'] = cont, 0
+			else:
+				frontier.popleft()
+
+		if with_subcats and recursive:
+			pages = tree
+		elif with_subcats:
+			# {'self': [...], subcat: [...]} of the root category
+			root = next(iter(tree.values()), {})
+			pages = {
+			    key: value if key == 'self' else value.get('self', [])
+			    for key, value in root.items()
+			}
+
+		if not frontier:
+			return pages, None
+		return pages, {'api': api, 'frontier': list(frontier), 'seen': list(seen)}
 
 	def get_pages(self,
 	              input_link: str,
@@ -215,7 +899,16 @@ class MediaWikiTools:
 	              recursive: bool = False,
 	              list_only: bool = False,
 	              use_api: bool = True,
-	              _base: bool = True) -> Union[list[str], dict]:
+	              as_tree: bool = False,
+	              max_depth: Optional[int] = None,
+	              max_pages: Optional[int] = None,
+	              max_requests: Optional[int] = None,
+	              deadline: Optional[float] = None,
+	              continuation: Optional[dict] = _NO_CONTINUATION,
+	              _base: bool = True,
+	              _first: Optional[Future] = None,
+	              _table: Optional[_TitleTable] = None
+	              ) -> Union[list[str], dict, CategoryTree, tuple]:
 		"""Get the pages from a category or list of the wiki.
 
 		Args:
@@ -241,8 +934,33 @@ class MediaWikiTools:
 			use_api (bool, optional): Whether to use the api (if present).
 				Defaults to true.
 
+			as_tree (bool, optional): With `with_subcats`, return a compact
+				`CategoryTree` instead of a dict. Category members are then not
+				added to the cache. Defaults to False.
+
+			max_depth (int, optional): Maximum depth of subcategories to get pages
+				from, implies `recursive`. Defaults to None.
+
+			max_pages (int, optional): Return at most this many pages. Defaults to
+				None.
+
+			max_requests (int, optional): Stop after this many http requests, the
+				requests for the listing in progress may go over it. Defaults to None.
+
+			deadline (float, optional): Stop after this time (`time.time()`).
+				Defaults to None.
+
+			continuation (dict, optional): Continuation returned by a previous
+				call, to continue where it stopped, or None to start a traversal that
+				can be continued. Not set by default.
+
 		Returns:
-			list[str] or dict: A list of pages.
+			list[str], dict or CategoryTree: A list of pages.
+
+			If any of `max_depth`, `max_pages`, `max_requests`, `deadline` or
+				`continuation` (even None) are given, a tuple of the pages found by
+				this call and the continuation (None once finished) is returned
+				instead.
 
 		Note:
 			API and non-API methods may return different results based on
@@ -251,21 +969,42 @@ class MediaWikiTools:
 		Note:
 			If recursive and with_subcats the function with return a nested
 				dictionary.
+		Note:
+			With limits, each category is visited once, so with `with_subcats` a
+				category with several parents is only listed under the first one
+				found. Pages of successive calls can be combined with `merge_pages`.
 		"""
-		pages: Union[list[str], dict] = {} if with_subcats else []
+		if continuation is not _NO_CONTINUATION or any(
+		    x is not None for x in (max_depth, max_pages, max_requests, deadline)):
+			if as_tree:
+				raise ValueError('as_tree can not be used with traversal limits')
+			return self._traverse(
+			    input_link,
+			    max_depth=(max_depth if max_depth is not None else
+			               None if recursive else int(get_subcats)),
+			    recursive=recursive or max_depth is not None,
+			    with_subcats=with_subcats,
+			    get_lists=get_lists,
+			    list_only=list_only,
+			    use_api=use_api,
+			    max_pages=max_pages,
+			    max_requests=max_requests,
+			    deadline=deadline,
+			    continuation=(None if continuation is _NO_CONTINUATION else
+			                  continuation))
+
+		if with_subcats and as_tree:
+			# all nodes of a tree share one title table
+			_table = _table or _TitleTable()
+			pages: Union[list[str], dict, CategoryTree] = CategoryTree(_table)
+		else:
+			pages = {} if with_subcats else []
 
 		if self.has_api and use_api:
-			cat_name = None
-
-			if any(x in input_link for x in self.base_url.split('/') if x):
-				i = input_link.split('/').index(self.page_name)
-				cat_name = '/'.join(input_link.split('/')[i + 1:])
-				cat_name = cat_name.split(
-				    ':', 1)[1] if 'Category:' in cat_name else cat_name
-
-			cat_name = input_link if not cat_name else cat_name
-			pages_res, subcats = self.mw.categorymembers(cat_name,
-			                                             results=None)
+			cat_name = self._category_name(input_link)
+			# a tree should not keep another copy of its pages in the cache
+			pages_res, subcats = self._category_members(cat_name,
+			                                            store=not as_tree)
 
 			# add current category links to result
 			pages_res = [
@@ -285,13 +1024,15 @@ class MediaWikiTools:
 					                           recursive=recursive,
 					                           with_subcats=(recursive
 					                                         and with_subcats),
-					                           _base=False)
+					                           as_tree=as_tree,
+					                           _base=False,
+					                           _table=_table)
 					if with_subcats:
 						# filter each sublist if they are not dicts
 						pages[cat] = [
 						    page for page in pages_res if self._filter_page(
 						        page, get_lists=get_lists, list_only=list_only)
-						] if not type(pages_res) == dict else pages_res
+						] if not isinstance(pages_res, Mapping) else pages_res
 					else:
 						pages.extend(pages_res)
 
@@ -308,59 +1049,60 @@ class MediaWikiTools:
 				raise NotImplementedError(
 				    'Web scraping not implemented for wikia/fandom.com')
 
-			data = self.get_data(input_link)
+			listing = self._iter_listing(input_link,
+			                             paginate=not list_only,
+			                             first=_first)
+			data = next(listing)
 
 			# get category name from input link
 			cat_name = input_link.split(':')[-1].replace('_', ' ')
 
-			# get page div if category
-			content = data.find(id='mw-pages')
-			# if category is title
-			is_category = 'Category:' in data.find(id='firstHeading').text
-
-			if is_category and not list_only:
-				links = data.find_all('a')
-
-				next_page = list(filter(lambda x: x.text == 'next page',
-				                        links))
-
+			if data.is_category and not list_only:
 				# get pages from subcats
-				if (get_subcats
-				    	or recursive) and (s := data.find(id='mw-subcategories')):
-					for input_link in s.find_all('a'):
-						if (h := input_link.get('href')) and 'Category' in h:
+				if (get_subcats or recursive) and data.subcats:
+					subcats = [(name, urljoin(self.base_url, h))
+					           for name, h in data.subcats]
+					# download and parse subcats in parallel with the pools
+					prefetched = {
+					    url: self._prefetch(url)
+					    for _, url in subcats
+					} if self.processes else {}
+
+					try:
+						for name, url in subcats:
 							pages_res = self.get_pages(
-							    self.base_url + h,
+							    url,
 							    get_subcats=recursive,
 							    get_lists=get_lists,
 							    recursive=recursive,
 							    with_subcats=(with_subcats and recursive),
 							    use_api=use_api,
-							    _base=False)
+							    as_tree=as_tree,
+							    _base=False,
+							    _first=prefetched.get(url),
+							    _table=_table)
 							if with_subcats:
-								pages[input_link.text] = pages_res
+								pages[name] = pages_res
 							else:
 								pages.extend(pages_res)
+					except BaseException:
+						# do not download the other subcats after a failure
+						for future in prefetched.values():
+							future.cancel()
+						raise
 
+				# pages of the first and following listing pages
 				links = [
-				    link.text for link in content.find_all('a')
-				    if self._filter_page(link, get_lists, list_only)
-				] if content else []
-
-				if len(next_page) != 0:
-					pages_res = self.get_pages(self.base_url +
-					                           next_page[0].get('href'),
-					                           get_lists=get_lists,
-					                           use_api=use_api)
-
-					links.extend(pages_res)
+				    name for data in chain([data], listing) for name in data.pages
+				    if self._filter_page(name, get_lists, list_only)
+				]
 
 			# get lists only
-			elif is_category and list_only:
+			elif data.is_category and list_only:
 				# assumption: all lists are on first page (>200 lists)
 				links = [
-				    link.text for link in content.find_all('a')
-				    if self._filter_page(link, get_lists, list_only)
+				    name for name in data.pages
+				    if self._filter_page(name, get_lists, list_only)
 				]
 			# if input_link is a List
 			else:
@@ -372,7 +1114,12 @@ class MediaWikiTools:
 				pages.extend(links)
 
 		if recursive and _base and with_subcats:
-			pages = {cat_name: pages}
+			if as_tree:
+				tree = CategoryTree(_table)
+				tree[cat_name] = pages
+				pages = tree
+			else:
+				pages = {cat_name: pages}
 
 		return pages
 
@@ -0,0 +1,94 @@
+"""WikiPool class module."""
+import requests
+from requests.adapters import HTTPAdapter
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Iterator, Optional
+from warnings import warn
+from .mediawikitools import MediaWikiTools, USER_AGENT
+
+
+class WikiPool:
+	"""Pool of MediaWikiTools objects sharing connections and caches.
+
+	Wikis are set up concurrently and queries run on all of them in parallel.
+
+	Args:
+		input_urls (list[str]): Urls of the wikis (see `MediaWikiTools`).
+		max_workers (int, optional): Maximum number of wikis queried at once.
+			Defaults to 16.
+		max_per_host (int, optional): Maximum concurrent requests to a single
+			host. Defaults to 4.
+
+	Note:
+		Wikis that fail to set up are left out of `wikis` and their exception is
+			stored in `errors`.
+	"""
+
+	def __init__(self,
+	             input_urls: list[str],
+	             max_workers: int = 16,
+	             max_per_host: int = 4):
+		"""Create WikiPool instance."""
+		self.max_workers = max_workers
+
+		self.session = requests.Session()
+		self.session.headers.update({'User-Agent': USER_AGENT})
+		# one connection pool per host, blocking once max_per_host are in use
+		adapter = HTTPAdapter(pool_connections=max(2 * len(input_urls), 10),
+		                      pool_maxsize=max_per_host,
+		                      pool_block=True)
+		self.session.mount('http://', adapter)
+		self.session.mount('https://', adapter)
+
+		self.cache: dict = {}
+		self.wikis: dict[str, MediaWikiTools] = {}
+		self.errors: dict[str, Exception] = {}
+
+		for url, wiki in self._map(
+		    lambda url: MediaWikiTools(url, session=self.session, cache=self.cache),
+		    input_urls):
+			if isinstance(wiki, Exception):
+				warn(f'Could not set up {url}: {wiki}')
+				self.errors[url] = wiki
+			else:
+				self.wikis[url] = wiki
+
+	def _map(self, func, urls) -> Iterator[tuple[str, Any]]:
+		"""Call `func` on each url in parallel, yield results as they finish."""
+		with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+			futures = {executor.submit(func, url): url for url in urls}
+			for future in as_completed(futures):
+				try:
+					yield futures[future], future.result()
+				except Exception as e:
+					yield futures[future], e
+
+	def map(self,
+	        method: str,
+	        *args,
+	        wikis: Optional[list[str]] = None,
+	        **kwargs) -> Iterator[tuple[str, Any]]:
+		"""Call a `MediaWikiTools` method on every wiki in parallel.
+
+		Args:
+			method (str): Name of the method, e.g. `'get_pages'`.
+			*args: Positional arguments of the method.
+			wikis (list[str], optional): Urls of the wikis to query. Defaults to
+				all wikis in the pool.
+			**kwargs: Keyword arguments of the method.
+
+		Yields:
+			tuple[str, Any]: Wiki url and result (or raised exception) as each wiki
+				finishes.
+		"""
+		urls = self.wikis if wikis is None else wikis
+		yield from self._map(
+		    lambda url: getattr(self.wikis[url], method)(*args, **kwargs), urls)
+
+	def get_pages(self, *args, **kwargs) -> Iterator[tuple[str, Any]]:
+		"""Run `MediaWikiTools.get_pages` on every wiki (see `map`)."""
+		return self.map('get_pages', *args, **kwargs)
+
+	def get_set(self, *args, **kwargs) -> Iterator[tuple[str, Any]]:
+		"""Run `MediaWikiTools.get_set` on every wiki (see `map`)."""
+		return self.map('get_set', *args, **kwargs)
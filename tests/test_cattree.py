@@ -0,0 +1,66 @@
+"""Test module for CategoryTree class."""
+from mwtools.cattree import CategoryTree
+from mwtools.mediawikitools import MediaWikiTools
+from tests.test_class import API_URL, offline_snapshot
+
+
+def test_category_tree():
+	legacy = {
+	    'Root': {
+	        'self': ['A', 'B'],
+	        'Sub 1': {
+	            'self': ['B', 'C'],
+	            'Sub 2': ['A', 'D']
+	        },
+	    }
+	}
+
+	tree = CategoryTree()
+	sub = CategoryTree(tree._table)
+	sub['self'] = ['B', 'C']
+	sub['Sub 2'] = ['A', 'D']
+	root = CategoryTree(tree._table)
+	root['Sub 1'] = sub
+	root['self'] = ['A', 'B']
+	tree['Root'] = root
+
+	assert tree.to_dict() == legacy
+	assert tree == legacy
+	assert set(tree['Root']) == {'self', 'Sub 1'}
+	assert tree['Root']['Sub 1']['Sub 2'] == ['A', 'D']
+	assert len(tree['Root']) == 2
+
+	# titles are stored once
+	assert tree._table.titles == ['B', 'C', 'A', 'D']
+	assert sorted(tree.flatten()) == ['A', 'B', 'C', 'D']
+	assert sorted(tree.flatten(unique=False)) == ['A', 'A', 'B', 'B', 'C', 'D']
+
+
+def test_get_pages_as_tree():
+	snapshot = offline_snapshot()
+	ws = MediaWikiTools.from_snapshot(snapshot)
+
+	tree = ws.get_pages('Root',
+	                    recursive=True,
+	                    with_subcats=True,
+	                    as_tree=True)
+	assert isinstance(tree, CategoryTree)
+	assert tree.to_dict() == ws.get_pages('Root',
+	                                      recursive=True,
+	                                      with_subcats=True)
+	assert tree.to_dict() == {
+	    'Root': {
+	        'self': ['A', 'B'],
+	        'Sub': {
+	            'self': ['C']
+	        }
+	    }
+	}
+	assert sorted(tree.flatten()) == ['A', 'B', 'C']
+
+	# members fetched for a tree are not added to the cache
+	del ws.cache[(API_URL, 'Sub')]
+	ws._category_batch = lambda cat_name, cont=None, limit='max': (['C'], [],
+	                                                             None)
+	ws.get_pages('Root', recursive=True, with_subcats=True, as_tree=True)
+	assert (API_URL, 'Sub') not in ws.cache
@@ -1,7 +1,13 @@
 """Test module for MediaWikiTools class."""
-from mwtools.mediawikitools import MediaWikiTools
+from mwtools.mediawikitools import MediaWikiTools, merge_pages
+import json
+import multiprocessing
+import pickle
 import pytest
 import requests
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from mwtools import mediawikitools
 from deepdiff import DeepDiff
 
 wiki_list = ('harrypotter.fandom.com',
@@ -14,6 +20,45 @@ wiki_list_no_api = ('https://proteopedia.org', 'https://www.werelate.org/')
 invalid_list = ('google', 'https://google', 'https://google/search',
                 'https://www.fakewiki.biz/', '	   ')
 
+API_URL = 'https://en.uncyclopedia.co/w/api.php'
+
+
+def offline_snapshot(has_api: bool = True) -> dict:
+	"""Snapshot of a wiki to test without connecting to it."""
+	return {
+	    'parsed_url': 'https://en.uncyclopedia.co',
+	    'base_url': 'https://en.uncyclopedia.co',
+	    'page_name': 'wiki',
+	    'page_base_url': 'https://en.uncyclopedia.co/wiki/',
+	    'api_url': API_URL if has_api else None,
+	    'has_api': has_api,
+	    'category_prefix': 'Category',
+	    'fetch_mode': 'render',
+	    'processes': 0,
+	    'cache': {
+	        (API_URL, 'Root'): (['A', 'B'], ['Sub']),
+	        (API_URL, 'Sub'): (['C'], []),
+	    } if has_api else {}
+	}
+
+
+class FakeSession:
+	"""Session answering requests from a dict of url to (status, html)."""
+
+	def __init__(self, pages: dict):
+		self.pages = pages
+		self.requests = []
+
+	def get(self, url, params=None):
+		if params:
+			url += ('&' if '?' in url else '?') + '&'.join(
+			    f'{k}={v}' for k, v in params.items())
+		self.requests.append(url)
+		status, text = self.pages.get(url, (404, '<p>Not found</p>'))
+		page = requests.Response()
+		page.status_code, page._content, page.url = status, text.encode(), url
+		return page
+
 
 def assert_pagelist_equivalent(reslist1: list[str],
                                reslist2: list[str]) -> None:
@@ -191,3 +236,431 @@ def test_get_set():
 	                        use_api=False)
 
 	assert_pagelist_equivalent(res_api, res_no_api)
+
+
+def test_get_data_render():
+	if not requests.get('https://en.uncyclopedia.co', timeout=5).ok:
+		pytest.skip('en.uncyclopedia.co seems to be down.')
+	ws = MediaWikiTools('https://en.uncyclopedia.co')
+
+	data = ws.get_data('Tribes of Britain')
+	assert ws.fetch_mode == 'render'
+	assert data.find(id='mw-pages')
+	assert not data.find(id='firstHeading')
+
+	data = ws.get_data('Tribes of Britain', full_page=True)
+	assert data.find(id='firstHeading')
+
+	assert '[[' in ws.get_wikitext('Category:Tribes of Britain')
+
+
+def test_get_pages_processes():
+	if not requests.get('https://en.uncyclopedia.co', timeout=5).ok:
+		pytest.skip('en.uncyclopedia.co seems to be down.')
+	ws = MediaWikiTools('https://en.uncyclopedia.co')
+
+	res = ws.get_pages('Tribes of Britain',
+	                   recursive=True,
+	                   with_subcats=True,
+	                   use_api=False)
+	with MediaWikiTools('https://en.uncyclopedia.co', processes=2) as ws_proc:
+		res_proc = ws_proc.get_pages('Tribes of Britain',
+		                             recursive=True,
+		                             with_subcats=True,
+		                             use_api=False)
+
+	assert res
+	assert not DeepDiff(res, res_proc, ignore_order=True)
+
+
+def test_parse_pool(monkeypatch):
+	created = []
+
+	class CountingPool(ProcessPoolExecutor):
+
+		def __init__(self, *args, **kwargs):
+			super().__init__(*args, **kwargs)
+			created.append(self)
+
+	monkeypatch.setattr(mediawikitools, 'ProcessPoolExecutor', CountingPool)
+
+	snapshot = offline_snapshot(has_api=False)
+	snapshot['processes'] = 2
+	html = ('<div class="mw-category-generated"><div id="mw-pages">'
+	        '<a href="/wiki/A">A</a></div></div>')
+
+	with MediaWikiTools.from_snapshot(snapshot) as ws:
+		# pools are created once when parsing from several threads
+		with ThreadPoolExecutor(max_workers=4) as executor:
+			listings = list(executor.map(ws._parse, [html] * 4))
+		assert [listing.pages for listing in listings] == [['A']] * 4
+		assert created == [ws._parse_pool]
+
+	# closed on exit
+	assert ws._parse_pool is None
+	with pytest.raises(RuntimeError):
+		created[0].submit(print)
+
+
+def test_close_after_failure():
+	base = 'https://en.uncyclopedia.co/wiki/'
+	subcats = [f'S{i}' for i in range(20)]
+	pages = {
+	    base + 'Category:Root?action=render':
+	    (200, '<div class="mw-category-generated"><div id="mw-subcategories">' +
+	     ''.join(f'<a href="/wiki/Category:{s}">{s}</a>' for s in subcats) +
+	     '</div></div>')
+	}
+	# S0 is missing
+	for s in subcats[1:]:
+		pages[base + f'Category:{s}?action=render'] = (
+		    200, '<div class="mw-category-generated"><div id="mw-pages">'
+		    f'<a href="/wiki/{s}_page">{s}_page</a></div></div>')
+	session = FakeSession(pages)
+
+	snapshot = offline_snapshot(has_api=False)
+	snapshot['processes'] = 2
+	errors = []
+
+	def scrape():
+		try:
+			with MediaWikiTools.from_snapshot(snapshot, session=session) as ws:
+				ws.get_pages('Root', recursive=True, use_api=False)
+		except Exception as e:
+			errors.append(e)
+
+	# closing must not wait forever on the prefetches of the other subcats
+	thread = threading.Thread(target=scrape, daemon=True)
+	thread.start()
+	thread.join(60)
+	assert not thread.is_alive()
+	assert len(errors) == 1
+	# pending prefetches are cancelled
+	assert len(session.requests) < len(pages) + 1
+
+
+def test_snapshot():
+	snapshot = offline_snapshot()
+
+	# restored without connecting to the wiki
+	ws = MediaWikiTools.from_snapshot(snapshot)
+	assert ws.snapshot() == snapshot
+	assert ws.get_pages('Root', recursive=True) == ['A', 'B', 'C']
+
+	ws_copy = pickle.loads(pickle.dumps(ws))
+	assert ws_copy.snapshot() == snapshot
+	assert ws_copy.session is not ws.session
+
+	# no cache unless one is given
+	snapshot['cache'] = None
+	ws = MediaWikiTools.from_snapshot(snapshot)
+	assert ws.cache is None
+	assert pickle.loads(pickle.dumps(ws)).cache is None
+	snapshot = offline_snapshot()
+
+	# other wikis in a shared cache are left out
+	cache = {('https://other.org/api.php', 'Root'): ([], [])}
+	ws = MediaWikiTools.from_snapshot(snapshot, cache=cache)
+	assert ws.cache is cache
+	assert ws.snapshot() == snapshot
+
+
+@pytest.mark.parametrize('first', ('session', 'mw', '_get_pools'))
+def test_fork(monkeypatch, first):
+	# pymediawiki client without connecting to the wiki
+	monkeypatch.setattr(mediawikitools, 'MediaWiki', lambda url: object())
+
+	snapshot = offline_snapshot()
+	snapshot['processes'] = 2
+	ws = MediaWikiTools.from_snapshot(snapshot, session=FakeSession({}))
+	parent = {
+	    'session': ws.session,
+	    'mw': ws.mw,
+	    '_get_pools': ws._get_pools(),
+	}
+
+	def child():
+		# the first use after the fork makes new connections and pools
+		value = getattr(ws, first)
+		value = value() if callable(value) else value
+		if first == '_get_pools':
+			assert all(c is not p for c, p in zip(value, parent[first]))
+		else:
+			assert value is not parent[first]
+
+		for name, value in parent.items():
+			new = getattr(ws, name)
+			new = new() if callable(new) else new
+			assert new is not value and new != value
+		assert isinstance(ws.session, requests.Session)
+		ws.close()
+
+	process = multiprocessing.get_context('fork').Process(target=child)
+	process.start()
+	process.join(30)
+	assert process.exitcode == 0
+
+	# the parent keeps its own
+	assert ws.session is parent['session']
+	assert ws.mw is parent['mw']
+	assert ws._get_pools() == parent['_get_pools']
+	ws.close()
+
+
+def test_fetch_render():
+	full_page = '<!DOCTYPE html><html><body><p>Full</p></body></html>'
+	base = 'https://en.uncyclopedia.co/wiki/'
+	session = FakeSession({
+	    base + 'Category:Root?action=render': (200, '<p>Root</p>'),
+	    base + 'Page?action=render': (200, '<p>Page</p>'),
+	})
+	ws = MediaWikiTools.from_snapshot(offline_snapshot(), session=session)
+
+	# category first, then page, without full page requests on 404
+	assert ws.get_data('Page').text == 'Page'
+	assert session.requests == [
+	    base + 'Category:Page?action=render', base + 'Page?action=render'
+	]
+	assert ws.fetch_mode == 'render'
+
+	# action=render ignored
+	session = FakeSession({base + 'Category:Root?action=render': (200, full_page)})
+	ws = MediaWikiTools.from_snapshot(offline_snapshot(), session=session)
+	assert ws.get_data('Root').text == 'Full'
+	assert ws.fetch_mode == 'full'
+	assert len(session.requests) == 1
+
+	# action=render disabled
+	session = FakeSession({
+	    base + 'Category:Root?action=render':
+	    (400, '<html><body>No such action</body></html>'),
+	    base + 'Category:Root': (200, full_page),
+	})
+	ws = MediaWikiTools.from_snapshot(offline_snapshot(), session=session)
+	assert ws.get_data('Root').text == 'Full'
+	assert ws.fetch_mode == 'full'
+	assert len(session.requests) == 2
+
+
+def test_iter_listing():
+	base = 'https://en.uncyclopedia.co'
+
+	def listing(pages, next_from=None, subcat_from=None):
+		html = '<div class="mw-category-generated">'
+		if subcat_from:
+			html += ('<div id="mw-subcategories"><a href="/w/index.php?title='
+			         f'Category:Root&amp;subcatfrom={subcat_from}#mw-subcategories"'
+			         ' title="Category:Root">next page</a></div>')
+		html += '<div id="mw-pages">' + ''.join(
+		    f'<a href="/wiki/{p}" title="{p}">{p}</a>' for p in pages)
+		if next_from:
+			html += ('<a href="/w/index.php?title=Category:Root&amp;pagefrom='
+			         f'{next_from}#mw-pages" title="Category:Root">next page</a>')
+		return html + '</div></div>'
+
+	pages = {
+	    'Root': listing(['A', 'B'], next_from='C', subcat_from='S'),
+	    f'{base}/w/index.php?title=Category:Root&pagefrom=C#mw-pages':
+	    listing(['C', 'D'], next_from='E'),
+	    f'{base}/w/index.php?title=Category:Root&pagefrom=E#mw-pages':
+	    listing(['E']),
+	}
+	requested = []
+	second_requested = threading.Event()
+
+	def get_page(input_page, full_page=False):
+		requested.append(input_page)
+		if len(requested) == 2:
+			second_requested.set()
+		page = requests.Response()
+		page.status_code, page._content = 200, pages[input_page].encode()
+		return page
+
+	ws = MediaWikiTools.from_snapshot(offline_snapshot(has_api=False))
+	ws._get_page = get_page
+
+	listings = ws._iter_listing('Root')
+	assert next(listings).pages == ['A', 'B']
+	# the next page is requested before the first one is consumed
+	assert second_requested.wait(5)
+
+	assert [p for listing in listings for p in listing.pages] == ['C', 'D', 'E']
+	# subcatfrom links are not followed
+	assert requested == list(pages)
+
+
+def test_category_name():
+	query = (API_URL + '?action=query&format=json&formatversion=2'
+	         '&list=categorymembers&cmtitle=Kategorie:1980 births'
+	         '&cmprop=title|type&cmtype=page|subcat|file&cmlimit=max')
+	members = {'query': {'categorymembers': [{'title': 'A', 'type': 'page'}]}}
+	session = FakeSession({query: (200, json.dumps(members))})
+	ws = MediaWikiTools.from_snapshot(offline_snapshot(), session=session)
+	ws.cache = None
+
+	for name in ('1980 births', 'Category:1980 births',
+	             'https://en.uncyclopedia.co/wiki/Category:1980_births'):
+		assert ws._category_name(name).replace('_', ' ') == '1980 births'
+
+	ws.category_prefix = 'Kategorie'
+	assert ws._category_name('Kategorie:1980 births') == '1980 births'
+	assert ws._category_name('Category:1980 births') == '1980 births'
+
+	# the prefix is sent once
+	assert ws.get_pages('Category:1980 births') == ['A']
+	assert session.requests == [query]
+
+
+def test_get_pages_limits_offline():
+	# api: Root has 2 batches and subcategory Sub
+	batches = {
+	    ('Root', None): (['A', 'B'], ['Sub'], {
+	        'cmcontinue': 'C'
+	    }),
+	    ('Root', 'C'): (['C'], [], None),
+	    ('Sub', None): (['D'], [], None),
+	}
+	snapshot = offline_snapshot()
+	snapshot['cache'] = None
+	ws = MediaWikiTools.from_snapshot(snapshot)
+
+	def category_batch(cat_name, cont=None, limit='max'):
+		# counted like the api request it stands for
+		ws._requests.count += 1
+		return batches[cat_name, cont and cont['cmcontinue']]
+
+	ws._category_batch = category_batch
+
+	# same shape as without limits
+	for kwargs in ({
+	    'get_subcats': True,
+	    'with_subcats': True
+	}, {
+	    'recursive': True,
+	    'with_subcats': True
+	}, {
+	    'recursive': True
+	}):
+		pages, continuation = ws.get_pages('Root', max_requests=10, **kwargs)
+		assert continuation is None
+		assert not DeepDiff(pages, ws.get_pages('Root', **kwargs),
+		                    ignore_order=True)
+
+	# one batch per call, merged
+	pages, continuation = ws.get_pages('Root',
+	                                   get_subcats=True,
+	                                   with_subcats=True,
+	                                   max_requests=1)
+	assert pages == {'self': ['A', 'B']}
+	while continuation:
+		more, continuation = ws.get_pages('Root',
+		                                  get_subcats=True,
+		                                  with_subcats=True,
+		                                  max_requests=1,
+		                                  continuation=continuation)
+		merge_pages(pages, more)
+	assert pages == {'self': ['A', 'B', 'C'], 'Sub': ['D']}
+
+	# resume loop starting from None, without other limits
+	pages, continuation = [], None
+	while True:
+		more, continuation = ws.get_pages('Root',
+		                                  recursive=True,
+		                                  continuation=continuation)
+		pages.extend(more)
+		if continuation is None:
+			break
+	assert pages == ['A', 'B', 'C', 'D']
+
+	# a category with two parents is listed under the first one only
+	batches['Root', None] = (['A', 'B'], ['Sub', 'Other'], {'cmcontinue': 'C'})
+	batches['Other', None] = (['E'], ['Sub'], None)
+	pages, _ = ws.get_pages('Root',
+	                        recursive=True,
+	                        with_subcats=True,
+	                        max_requests=10)
+	assert pages == {
+	    'Root': {
+	        'self': ['A', 'B', 'C'],
+	        'Sub': {
+	            'self': ['D']
+	        },
+	        'Other': {
+	            'self': ['E']
+	        }
+	    }
+	}
+	assert ws.get_pages('Root', recursive=True,
+	                    with_subcats=True)['Root']['Other']['Sub'] == {
+	                        'self': ['D']
+	                    }
+
+	# categories are visited once
+	batches['Root', None] = (['A', 'B'], ['Sub'], {'cmcontinue': 'C'})
+	batches['Sub', None] = (['D'], ['Root'], None)
+	assert ws.get_pages('Root', recursive=True,
+	                    max_requests=10) == (['A', 'B', 'C', 'D'], None)
+
+	# scraping: user pages are checked with an extra request
+	base = 'https://en.uncyclopedia.co/wiki/'
+	session = FakeSession({
+	    base + 'Category:Root?action=render':
+	    (200, '<div class="mw-category-generated"><div id="mw-subcategories">'
+	     '<a href="/wiki/Category:Sub">Sub</a></div><div id="mw-pages">'
+	     '<a href="/wiki/A">A</a><a href="/wiki/User:B">User:B</a>'
+	     '<a href="/wiki/C">C</a></div></div>'),
+	    base + 'User:B?action=render': (200, '<p>User page</p>'),
+	    base + 'Category:Sub?action=render':
+	    (200, '<div class="mw-category-generated"><div id="mw-pages">'
+	     '<a href="/wiki/D">D</a></div></div>'),
+	})
+	ws = MediaWikiTools.from_snapshot(offline_snapshot(has_api=False),
+	                                  session=session)
+
+	pages, continuation = ws.get_pages('Root', recursive=True, max_requests=2)
+	assert pages == ['A', 'User:B', 'C']
+	assert len(session.requests) == 2
+	assert continuation
+
+	# max_pages stops within a listing and continues from the same offset
+	pages, continuation = ws.get_pages('Root', recursive=True, max_pages=2)
+	assert pages == ['A', 'User:B']
+	pages, continuation = ws.get_pages('Root',
+	                                   recursive=True,
+	                                   max_pages=2,
+	                                   continuation=continuation)
+	assert pages == ['C', 'D']
+	assert continuation is None
+
+
+@pytest.mark.parametrize('use_api', (True, False))
+def test_get_pages_limits(use_api):
+	if not requests.get('https://en.uncyclopedia.co', timeout=5).ok:
+		pytest.skip('en.uncyclopedia.co seems to be down.')
+	ws = MediaWikiTools('https://en.uncyclopedia.co')
+	cat = 'Tribes of Britain'
+
+	res = ws.get_pages(cat, recursive=True, use_api=use_api)
+
+	# one request at a time, resuming from a serialised continuation
+	res_limited, continuation = ws.get_pages(cat,
+	                                         recursive=True,
+	                                         use_api=use_api,
+	                                         max_requests=1)
+	while continuation:
+		continuation = json.loads(json.dumps(continuation))
+		pages, continuation = ws.get_pages(cat,
+		                                   recursive=True,
+		                                   use_api=use_api,
+		                                   max_requests=1,
+		                                   continuation=continuation)
+		res_limited.extend(pages)
+
+	assert_pagelist_equivalent(res, res_limited)
+
+	pages, continuation = ws.get_pages(cat, use_api=use_api, max_depth=0)
+	assert continuation is None
+	assert_pagelist_equivalent(pages, ws.get_pages(cat, use_api=use_api))
+
+	pages, _ = ws.get_pages(cat, recursive=True, use_api=use_api, max_pages=1)
+	assert len(pages) == 1
@@ -0,0 +1,100 @@
+"""Test module for the mwtools command line interface."""
+from mwtools import cli
+from mwtools.cli import main, read_queries
+from mwtools.mediawikitools import MediaWikiTools
+from tests.test_class import offline_snapshot
+import json
+import pytest
+import requests
+
+
+def test_read_queries(tmp_path):
+	batch = tmp_path / 'batch.jsonl'
+	batch.write_text(
+	    '{"id": "a", "wiki": "en.wikipedia.org", "get_pages": {"input_link": "X"}}\n'
+	    '\n'
+	    '{"get_set": {"categories": ["X", "Y"], "operations": "&"}}\n')
+
+	queries = read_queries(str(batch), default_wiki='en.uncyclopedia.co')
+	assert queries == [{
+	    'id': 'a',
+	    'wiki': 'en.wikipedia.org',
+	    'method': 'get_pages',
+	    'kwargs': {
+	        'input_link': 'X'
+	    }
+	}, {
+	    'id': 1,
+	    'wiki': 'en.uncyclopedia.co',
+	    'method': 'get_set',
+	    'kwargs': {
+	        'categories': ['X', 'Y'],
+	        'operations': '&'
+	    }
+	}]
+
+	with pytest.raises(ValueError):
+		read_queries(str(batch))
+
+	batch.write_text('{"wiki": "en.wikipedia.org", "get_info": {}}\n')
+	with pytest.raises(ValueError):
+		read_queries(str(batch))
+
+
+def test_main(tmp_path):
+	if not requests.get('https://en.uncyclopedia.co', timeout=5).ok:
+		pytest.skip('en.uncyclopedia.co seems to be down.')
+	batch = tmp_path / 'batch.jsonl'
+	batch.write_text('{"id": "tribes", "get_pages": '
+	                 '{"input_link": "Tribes of Britain"}}\n'
+	                 '{"id": "bad", "get_pages": {"bad_arg": 1}}\n')
+	output = tmp_path / 'out.jsonl'
+
+	code = main([
+	    str(batch), '-o',
+	    str(output), '--wiki', 'https://en.uncyclopedia.co'
+	])
+
+	results = {
+	    r['id']: r for r in map(json.loads,
+	                            output.read_text().splitlines())
+	}
+	assert code == 1
+	assert results['tribes']['result']
+	assert 'error' in results['bad']
+
+
+def test_main_as_tree(tmp_path, monkeypatch):
+
+	class StubPool:
+
+		def __init__(self, input_urls, **kwargs):
+			self.wikis = {
+			    url: MediaWikiTools.from_snapshot(offline_snapshot())
+			    for url in input_urls
+			}
+			self.errors = {}
+
+	monkeypatch.setattr(cli, 'WikiPool', StubPool)
+	batch = tmp_path / 'batch.jsonl'
+	batch.write_text('{"id": "tree", "get_pages": {"input_link": "Root", '
+	                 '"recursive": true, "with_subcats": true, "as_tree": true}}\n'
+	                 '{"id": "list", "get_pages": {"input_link": "Root"}}\n')
+	output = tmp_path / 'out.jsonl'
+
+	code = cli.main([str(batch), '-o', str(output), '--wiki', 'wiki.org'])
+
+	results = {
+	    r['id']: r for r in map(json.loads,
+	                            output.read_text().splitlines())
+	}
+	assert code == 0
+	assert results['tree']['result'] == {
+	    'Root': {
+	        'self': ['A', 'B'],
+	        'Sub': {
+	            'self': ['C']
+	        }
+	    }
+	}
+	assert results['list']['result'] == ['A', 'B']
@@ -0,0 +1,70 @@
+"""Test module for WikiPool class."""
+from mwtools.wikipool import WikiPool
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+import requests
+import threading
+import time
+
+
+def test_wikipool():
+	wikis = ['https://en.uncyclopedia.co', 'en.wikipedia.org']
+	for wiki in ['https://en.uncyclopedia.co', 'https://en.wikipedia.org']:
+		if not requests.get(wiki, timeout=5).ok:
+			pytest.skip(f'{wiki} seems to be down.')
+
+	pool = WikiPool(wikis + ['https://www.fakewiki.biz/'], max_per_host=2)
+
+	assert set(pool.wikis) == set(wikis)
+	assert 'https://www.fakewiki.biz/' in pool.errors
+	assert all(ws.session is pool.session for ws in pool.wikis.values())
+
+	res = dict(pool.get_pages('Tribes of Britain',
+	                          wikis=['https://en.uncyclopedia.co']))
+	assert res['https://en.uncyclopedia.co']
+	assert res['https://en.uncyclopedia.co'] == \
+	    pool.wikis['https://en.uncyclopedia.co'].get_pages('Tribes of Britain')
+
+	res = dict(pool.get_set(['Countries in Asia', 'Countries_in_Europe'], '&'))
+	assert set(res) == set(wikis)
+	assert res['en.wikipedia.org']
+
+
+def test_wikipool_max_per_host():
+	active, peak = 0, 0
+	lock = threading.Lock()
+
+	class SlowBodyHandler(BaseHTTPRequestHandler):
+		protocol_version = 'HTTP/1.1'
+
+		def do_GET(self):
+			nonlocal active, peak
+			with lock:
+				active += 1
+				peak = max(peak, active)
+			self.send_response(200)
+			self.send_header('Content-Length', '4')
+			self.end_headers()
+			# headers arrive before the body is done
+			self.wfile.write(b'ab')
+			self.wfile.flush()
+			time.sleep(0.2)
+			self.wfile.write(b'cd')
+			with lock:
+				active -= 1
+
+		def log_message(self, *args):
+			pass
+
+	server = ThreadingHTTPServer(('127.0.0.1', 0), SlowBodyHandler)
+	threading.Thread(target=server.serve_forever, daemon=True).start()
+	url = f'http://127.0.0.1:{server.server_port}/'
+
+	pool = WikiPool([], max_per_host=2)
+	with ThreadPoolExecutor(max_workers=8) as executor:
+		bodies = list(executor.map(lambda _: pool.session.get(url).text, range(8)))
+	server.shutdown()
+
+	assert bodies == ['abcd'] * 8
+	assert peak == 2